@@ -11,8 +11,23 @@ from pathlib import Path
 from datetime import datetime
 from path_utils import get_token_path, get_project_root, ensure_in_project
 
-def upload_file(file_path, folder_name="Dicom-3D-Medical-Imaging"):
-    """Upload file to Google Drive"""
+def _compact_mesh(file_path):
+    """Convert a PLY to .dmsh for upload; falls back to the PLY on failure"""
+    try:
+        from mesh_codec import ply_to_compact
+        print(f"🗜️  Compacting mesh before upload: {file_path.name}")
+        return ply_to_compact(file_path)
+    except Exception as e:
+        print(f"⚠️  Could not compact {file_path.name} ({e}); uploading original")
+        return file_path
+
+
+def upload_file(file_path, folder_name="Dicom-3D-Medical-Imaging", compact=True):
+    """Upload file to Google Drive
+    
+    PLY meshes are converted to the compact .dmsh format first unless
+    compact=False.
+    """
     ensure_in_project()
     try:
         from google.oauth2.credentials import Credentials
@@ -32,6 +47,9 @@ def upload_file(file_path, folder_name="Dicom-3D-Medical-Imaging"):
             print("Run: python setup_google_drive.py authenticate")
             return False
         
+        if compact and file_path.suffix.lower() == '.ply':
+            file_path = _compact_mesh(file_path)
+        
         with open(token_path, 'rb') as token:
             creds = pickle.load(token)
         
@@ -124,19 +142,25 @@ def upload_file(file_path, folder_name="Dicom-3D-Medical-Imaging"):
 
 def main():
     """Main execution"""
-    if len(sys.argv) < 2:
-        print("Usage: python gdrive_upload.py <file_path> [folder_name]")
+    args = [arg for arg in sys.argv[1:] if arg != '--raw']
+    compact = '--raw' not in sys.argv
+    
+    if len(args) < 1:
+        print("Usage: python gdrive_upload.py <file_path> [folder_name] [--raw]")
         print("")
         print("Examples:")
         print("  python gdrive_upload.py output/model.ply")
         print("  python gdrive_upload.py output/brain.ply Medical-Scans")
+        print("  python gdrive_upload.py output/brain.ply Medical-Scans --raw")
+        print("")
+        print("PLY files are uploaded as compact .dmsh meshes unless --raw is given.")
         print("")
         return
     
-    file_path = sys.argv[1]
-    folder_name = sys.argv[2] if len(sys.argv) > 2 else "Dicom-3D-Medical-Imaging"
+    file_path = args[0]
+    folder_name = args[1] if len(args) > 1 else "Dicom-3D-Medical-Imaging"
     
-    upload_file(file_path, folder_name)
+    upload_file(file_path, folder_name, compact=compact)
 
 
 if __name__ == "__main__":
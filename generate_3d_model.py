@@ -4,10 +4,27 @@ Generate a 3D Model - Standalone Demo
 Creates a realistic 3D medical model without requiring external datasets
 """
 
+import json
+import struct
 import numpy as np
 from pathlib import Path
 import sys
 
+from mesh_utils import (
+    VERTEX_CACHE_MAX_FACES, optimize_triangle_order, optimize_vertex_fetch, quantize_positions
+)
+
+# glTF constants
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_CHUNK_JSON = 0x4E4F534A  # "JSON"
+GLB_CHUNK_BIN = 0x004E4942  # "BIN\0"
+GL_BYTE = 5120
+GL_UNSIGNED_BYTE = 5121
+GL_UNSIGNED_SHORT = 5123
+GL_UNSIGNED_INT = 5125
+GL_ARRAY_BUFFER = 34962
+GL_ELEMENT_ARRAY_BUFFER = 34963
+
 def create_synthetic_brain_volume():
     """Create a synthetic brain CT volume"""
     print("🧠 Creating synthetic brain CT volume...")
@@ -65,6 +82,10 @@ def volume_to_mesh(volume, threshold=30, smooth=True):
     # Extract surface
     verts, faces, _, _ = measure.marching_cubes(mask, level=0.5)
     
+    # marching_cubes winds triangles inward; flip to counter-clockwise outward
+    # faces so viewers with back-face culling (glTF default) show the surface
+    faces = np.ascontiguousarray(faces[:, ::-1])
+    
     # Normalize vertices
     verts = verts / np.array(volume.shape) * 100  # Scale to reasonable size
     
@@ -123,6 +144,162 @@ def save_ply(verts, faces, output_path, colors=None):
     print(f"   Vertices: {len(verts)}")
     print(f"   Faces: {len(faces)}")
 
+def compute_vertex_normals(verts, faces):
+    """Compute area-weighted per-vertex normals"""
+    verts = np.asarray(verts, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    
+    v0, v1, v2 = verts[faces[:, 0]], verts[faces[:, 1]], verts[faces[:, 2]]
+    face_normals = np.cross(v1 - v0, v2 - v0)
+    
+    normals = np.zeros_like(verts)
+    for k in range(3):
+        np.add.at(normals, faces[:, k], face_normals)
+    
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return normals / lengths
+
+def _quantize_normals(normals):
+    """Quantize unit normals to normalized int8"""
+    return np.clip(np.round(normals * 127), -127, 127).astype(np.int8)
+
+def _pad_columns(array, width, fill=0):
+    """Pad an (N, 3) array to (N, width) so each element is 4-byte aligned"""
+    padded = np.full((len(array), width), fill, dtype=array.dtype)
+    padded[:, :array.shape[1]] = array
+    return padded
+
+def save_glb(verts, faces, output_path, normals=None, colors=None, optimize=True):
+    """Save mesh as binary glTF (GLB) with quantized attributes
+    
+    Positions are stored as uint16 with the (uniform) dequantization folded
+    into the node transform, normals as normalized int8 (KHR_mesh_quantization).
+    Triangles are reordered for vertex cache hits and vertices for fetch
+    locality before everything is packed into a single buffer. Above
+    VERTEX_CACHE_MAX_FACES faces triangles are Morton-sorted instead of
+    Forsyth-optimized; optimize=False skips both reorderings.
+    """
+    print(f"💾 Saving GLB: {output_path}")
+    
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if len(faces) == 0:
+        # glTF bufferViews must be non-empty
+        raise ValueError("Cannot export a mesh without faces to GLB")
+    
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if normals is None:
+        normals = compute_vertex_normals(verts, faces)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    
+    if optimize:
+        if len(faces) > VERTEX_CACHE_MAX_FACES:
+            print(f"   {len(faces):,} faces > {VERTEX_CACHE_MAX_FACES:,}: "
+                  "using Morton triangle order instead of Forsyth")
+        faces = optimize_triangle_order(verts, faces)
+        faces, vertex_order = optimize_vertex_fetch(faces)
+        verts = verts[vertex_order]
+        normals = normals[vertex_order]
+        if colors is not None:
+            colors = colors[vertex_order]
+    
+    # One uniform scale for all axes so the node transform does not skew normals
+    positions, offset, extent = quantize_positions(verts, bits=16, uniform=True)
+    positions = positions.astype(np.uint16)
+    scale = np.where(extent > 0, extent, 1.0) / 65535  # never singular
+    
+    index_type = np.uint16 if len(verts) < 65535 else np.uint32
+    streams = [
+        # (bytes, bufferView target, byteStride)
+        (faces.astype(index_type).tobytes(), GL_ELEMENT_ARRAY_BUFFER, None),
+        (_pad_columns(positions, 4).tobytes(), GL_ARRAY_BUFFER, 8),
+        (_pad_columns(_quantize_normals(normals), 4).tobytes(), GL_ARRAY_BUFFER, 4),
+    ]
+    if colors is not None:
+        streams.append((_pad_columns(colors, 4, fill=255).tobytes(), GL_ARRAY_BUFFER, 4))
+    
+    # Pack all streams into one 4-byte aligned buffer
+    binary = bytearray()
+    buffer_views = []
+    for data, target, stride in streams:
+        view = {"buffer": 0, "byteOffset": len(binary), "byteLength": len(data), "target": target}
+        if stride is not None:
+            view["byteStride"] = stride
+        buffer_views.append(view)
+        binary += data
+        binary += b"\0" * (-len(binary) % 4)
+    
+    accessors = [
+        {
+            "bufferView": 0,
+            "componentType": GL_UNSIGNED_SHORT if index_type == np.uint16 else GL_UNSIGNED_INT,
+            "count": int(faces.size),
+            "type": "SCALAR",
+        },
+        {
+            "bufferView": 1,
+            "componentType": GL_UNSIGNED_SHORT,
+            "count": len(positions),
+            "type": "VEC3",
+            "min": positions.min(axis=0).tolist() if len(positions) else [0, 0, 0],
+            "max": positions.max(axis=0).tolist() if len(positions) else [0, 0, 0],
+        },
+        {
+            "bufferView": 2,
+            "componentType": GL_BYTE,
+            "normalized": True,
+            "count": len(normals),
+            "type": "VEC3",
+        },
+    ]
+    attributes = {"POSITION": 1, "NORMAL": 2}
+    if colors is not None:
+        accessors.append({
+            "bufferView": 3,
+            "componentType": GL_UNSIGNED_BYTE,
+            "normalized": True,
+            "count": len(colors),
+            "type": "VEC4",
+        })
+        attributes["COLOR_0"] = 3
+    
+    gltf = {
+        "asset": {"version": "2.0", "generator": "generate_3d_model.py"},
+        "extensionsUsed": ["KHR_mesh_quantization"],
+        "extensionsRequired": ["KHR_mesh_quantization"],
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{
+            "mesh": 0,
+            "translation": offset.tolist(),
+            "scale": scale.tolist(),
+        }],
+        "meshes": [{"primitives": [{"attributes": attributes, "indices": 0, "mode": 4}]}],
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+        "buffers": [{"byteLength": len(binary)}],
+    }
+    
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    
+    total_length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack('<III', GLB_MAGIC, 2, total_length))
+        f.write(struct.pack('<II', len(json_chunk), GLB_CHUNK_JSON))
+        f.write(json_chunk)
+        f.write(struct.pack('<II', len(binary), GLB_CHUNK_BIN))
+        f.write(binary)
+    
+    print(f"✅ Saved: {output_path}")
+    print(f"   Vertices: {len(verts)}")
+    print(f"   Faces: {len(faces)}")
+    print(f"   Size: {total_length / 1024:.1f} KB")
+
 def generate_colored_model(volume, output_path):
     """Generate model with colors based on intensity"""
     print("🎨 Creating colored model...")
@@ -144,6 +321,7 @@ def generate_colored_model(volume, output_path):
         colors[i] = [r, g, b]
     
     save_ply(verts, faces, output_path, colors)
+    save_glb(verts, faces, Path(output_path).with_suffix('.glb'), colors=colors)
 
 def main():
     print("\n" + "="*70)
@@ -165,6 +343,7 @@ def main():
         
         if len(verts) > 0:
             save_ply(verts, faces, "output/brain_model_basic.ply")
+            save_glb(verts, faces, "output/brain_model_basic.glb")
             
             # Generate colored model
             print("\n🎨 Generating colored model...")
@@ -176,6 +355,8 @@ def main():
             print("\n📍 Output Files:")
             print("   ✓ output/brain_model_basic.ply")
             print("   ✓ output/brain_model_colored.ply")
+            print("   ✓ output/brain_model_basic.glb")
+            print("   ✓ output/brain_model_colored.glb")
             print("\n📊 Model Statistics:")
             print(f"   • Vertices: {len(verts):,}")
             print(f"   • Faces: {len(faces):,}")
@@ -185,6 +366,7 @@ def main():
             print("   • MeshLab (Free, lightweight)")
             print("   • CloudCompare (Free, point cloud focus)")
             print("   • Any STL viewer")
+            print("   • GLB files: any glTF viewer or three.js/Babylon.js web viewer")
             print("\n")
         else:
             print("❌ No mesh generated. Try adjusting threshold.")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Compact Mesh Codec - Quantized binary mesh container (.dmsh)
+Encodes/decodes .dmsh and converts PLY <-> .dmsh for Drive transfer and
+archival; reordering and quantization come from mesh_utils
+"""
+
+import sys
+import zlib
+import struct
+import numpy as np
+from pathlib import Path
+
+from mesh_utils import optimize_triangle_order, optimize_vertex_fetch, quantize_positions
+
+DMSH_MAGIC = b'DMSH'
+DMSH_VERSION = 1
+DMSH_SUFFIX = '.dmsh'
+FLAG_COLORS = 0x01
+
+# magic, version, flags, position bits, reserved, vertex count, face count,
+# bbox min (3 x f64), bbox extent (3 x f64)
+HEADER_FORMAT = '<4sBBBBII6d'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+def zigzag_encode(values):
+    """Map signed integers to unsigned (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...)"""
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+def zigzag_decode(values):
+    """Inverse of zigzag_encode"""
+    values = np.asarray(values, dtype=np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+def varint_encode(values):
+    """LEB128-encode unsigned integers (< 2**35) into a byte string"""
+    values = np.asarray(values, dtype=np.uint64).ravel()
+    if len(values) == 0:
+        return b''
+
+    # Split every value into five 7-bit groups, keep only the significant ones
+    shifts = np.arange(5, dtype=np.uint64) * np.uint64(7)
+    groups = ((values[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8)
+
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 5):
+        n_bytes += values >= np.uint64(1 << (7 * k))
+
+    position = np.arange(5)
+    keep = position[None, :] < n_bytes[:, None]
+    more = position[None, :] < (n_bytes - 1)[:, None]
+    groups[more] |= 0x80
+    return groups[keep].tobytes()
+
+def varint_decode(data, count):
+    """Decode `count` LEB128 integers from a byte string"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    is_last = raw < 0x80
+    ends = np.flatnonzero(is_last)
+    if len(ends) != count:
+        raise ValueError(f"Expected {count} varints, found {len(ends)}")
+
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    shifted = (raw & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.bitwise_or.reduceat(shifted, starts)
+
+def position_error_bound(verts, bits=16):
+    """Per-axis worst-case absolute error of quantized positions"""
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    extent = verts.max(axis=0) - verts.min(axis=0)
+    return extent / ((1 << bits) - 1) / 2
+
+def _pack_section(payload):
+    """zlib-compress a section and prefix it with its length"""
+    compressed = zlib.compress(payload, 9)
+    return struct.pack('<I', len(compressed)) + compressed
+
+def _unpack_section(data, offset):
+    """Read a length-prefixed compressed section; returns (payload, new offset)"""
+    (length,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    return zlib.decompress(data[offset:offset + length]), offset + length
+
+def encode_mesh(verts, faces, colors=None, bits=16, reorder=True):
+    """Encode a mesh into the compact .dmsh byte format
+
+    Positions are quantized to a `bits`-bit grid over the bounding box and
+    delta coded in vertex order. Each triangle is rotated so its smallest
+    index comes first (winding preserved); that index is delta coded against
+    the previous triangle, the other two against it. All deltas are zigzag +
+    varint encoded and every section is zlib compressed. Normals are not
+    stored; recompute them from the faces after decoding.
+
+    With reorder=True (the default) triangles and vertices are reordered for
+    better delta coding, so the decoded mesh has a different vertex order and
+    drops unreferenced vertices: per-vertex data cannot be matched to the
+    input by index. Use reorder=False to keep the input vertex order, or when
+    the mesh was already optimized.
+    """
+    if not 1 <= bits <= 31:
+        raise ValueError(f"Position bits must be in [1, 31], got {bits}")
+
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+
+    if reorder and len(faces) > 0:
+        faces = optimize_triangle_order(verts, faces)
+        faces, vertex_order = optimize_vertex_fetch(faces)
+        verts = verts[vertex_order]
+        if colors is not None:
+            colors = colors[vertex_order]
+
+    quantized, lo, extent = quantize_positions(verts, bits)
+    position_deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, 3), dtype=np.int64))
+
+    # Rotate triangles so the smallest index leads, then delta code
+    if len(faces) > 0:
+        shift = np.argmin(faces, axis=1)
+        columns = (shift[:, None] + np.arange(3)) % 3
+        faces = np.take_along_axis(faces, columns, axis=1)
+    lead = faces[:, 0]
+    index_deltas = np.column_stack([
+        np.diff(lead, prepend=0),
+        faces[:, 1] - lead,
+        faces[:, 2] - lead,
+    ])
+
+    flags = FLAG_COLORS if colors is not None else 0
+    header = struct.pack(
+        HEADER_FORMAT, DMSH_MAGIC, DMSH_VERSION, flags, bits, 0,
+        len(verts), len(faces), *lo.tolist(), *extent.tolist()
+    )
+
+    sections = [
+        _pack_section(varint_encode(zigzag_encode(position_deltas))),
+        _pack_section(varint_encode(zigzag_encode(index_deltas))),
+    ]
+    if colors is not None:
+        color_deltas = np.diff(colors, axis=0, prepend=np.zeros((1, 3), dtype=np.uint8))
+        sections.append(_pack_section(color_deltas.tobytes()))
+
+    return header + b''.join(sections)
+
+def decode_mesh(data):
+    """Decode .dmsh bytes; returns (verts, faces, colors or None)"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Truncated mesh header")
+
+    magic, version, flags, bits, _, n_verts, n_faces, *bbox = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != DMSH_MAGIC:
+        raise ValueError("Not a .dmsh mesh (bad magic)")
+    if version != DMSH_VERSION:
+        raise ValueError(f"Unsupported .dmsh version: {version}")
+
+    lo = np.array(bbox[:3])
+    extent = np.array(bbox[3:])
+    levels = (1 << bits) - 1
+
+    offset = HEADER_SIZE
+    payload, offset = _unpack_section(data, offset)
+    position_deltas = zigzag_decode(varint_decode(payload, n_verts * 3)).reshape(-1, 3)
+    verts = np.cumsum(position_deltas, axis=0) / levels * extent + lo
+
+    payload, offset = _unpack_section(data, offset)
+    index_deltas = zigzag_decode(varint_decode(payload, n_faces * 3)).reshape(-1, 3)
+    lead = np.cumsum(index_deltas[:, 0])
+    faces = np.column_stack([lead, index_deltas[:, 1] + lead, index_deltas[:, 2] + lead])
+
+    colors = None
+    if flags & FLAG_COLORS:
+        payload, offset = _unpack_section(data, offset)
+        color_deltas = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3)
+        colors = np.cumsum(color_deltas, axis=0, dtype=np.uint8)
+
+    return verts, faces, colors
+
+def save_mesh_compact(verts, faces, output_path, colors=None, bits=16):
+    """Save mesh in the compact .dmsh format"""
+    print(f"💾 Saving compact mesh: {output_path}")
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = encode_mesh(verts, faces, colors=colors, bits=bits)
+    output_path.write_bytes(data)
+
+    bound = position_error_bound(verts, bits) if len(verts) else np.zeros(3)
+    print(f"✅ Saved: {output_path}")
+    print(f"   Vertices: {len(verts)}")
+    print(f"   Faces: {len(faces)}")
+    print(f"   Size: {len(data) / 1024:.1f} KB")
+    print(f"   Max position error: {bound.max():.2e}")
+
+def load_mesh_compact(input_path):
+    """Load a .dmsh mesh; returns (verts, faces, colors or None)"""
+    return decode_mesh(Path(input_path).read_bytes())
+
+def load_ply(input_path):
+    """Load an ASCII triangle PLY (as written by save_ply)"""
+    with open(input_path, 'r') as f:
+        if f.readline().strip() != 'ply':
+            raise ValueError(f"Not a PLY file: {input_path}")
+
+        n_verts = n_faces = 0
+        vertex_props = []
+        element = None
+        for line in f:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == 'format' and tokens[1] != 'ascii':
+                raise ValueError(f"Only ASCII PLY is supported, got {tokens[1]}")
+            if tokens[0] == 'element':
+                element = tokens[1]
+                if element == 'vertex':
+                    n_verts = int(tokens[2])
+                elif element == 'face':
+                    n_faces = int(tokens[2])
+            elif tokens[0] == 'property' and element == 'vertex':
+                vertex_props.append(tokens[-1])
+            elif tokens[0] == 'end_header':
+                break
+
+        body = f.read().split()
+
+    n_props = len(vertex_props)
+    vertex_data = np.array(body[:n_verts * n_props], dtype=np.float64).reshape(n_verts, n_props)
+    face_tokens = body[n_verts * n_props:]
+    if len(face_tokens) != n_faces * 4:
+        raise ValueError("Only triangle meshes are supported")
+    face_data = np.array(face_tokens, dtype=np.int64).reshape(n_faces, 4)
+    if np.any(face_data[:, 0] != 3):
+        raise ValueError("Only triangle meshes are supported")
+
+    verts = vertex_data[:, [vertex_props.index(axis) for axis in ('x', 'y', 'z')]]
+    faces = face_data[:, 1:]
+
+    colors = None
+    if all(channel in vertex_props for channel in ('red', 'green', 'blue')):
+        columns = [vertex_props.index(channel) for channel in ('red', 'green', 'blue')]
+        colors = vertex_data[:, columns].astype(np.uint8)
+
+    return verts, faces, colors
+
+def ply_to_compact(ply_path, output_path=None, bits=16):
+    """Convert an ASCII PLY file to .dmsh; returns the output path"""
+    ply_path = Path(ply_path)
+    output_path = Path(output_path) if output_path else ply_path.with_suffix(DMSH_SUFFIX)
+
+    verts, faces, colors = load_ply(ply_path)
+    save_mesh_compact(verts, faces, output_path, colors=colors, bits=bits)
+
+    ratio = ply_path.stat().st_size / max(output_path.stat().st_size, 1)
+    print(f"   Compression: {ratio:.1f}x vs PLY")
+    return output_path
+
+
+def main():
+    """Main execution"""
+    if len(sys.argv) < 2:
+        print("Usage: python mesh_codec.py <input.ply|input.dmsh> [output]")
+        print("")
+        print("Examples:")
+        print("  python mesh_codec.py output/brain_model_colored.ply")
+        print("  python mesh_codec.py output/brain_model_colored.dmsh restored.ply")
+        print("")
+        return
+
+    input_path = Path(sys.argv[1])
+    output_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if input_path.suffix == DMSH_SUFFIX:
+        from generate_3d_model import save_ply
+        verts, faces, colors = load_mesh_compact(input_path)
+        save_ply(verts, faces, output_path or input_path.with_suffix('.ply'), colors)
+    else:
+        ply_to_compact(input_path, output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Mesh Utilities - Shared mesh optimization and quantization
+Triangle/vertex reordering and bounding-box quantization used by exporters
+"""
+
+import numpy as np
+
+# Forsyth vertex-cache optimizer tuning (see "Linear-Speed Vertex Cache Optimisation")
+VERTEX_CACHE_SIZE = 32
+VERTEX_CACHE_MAX_FACES = 250_000  # larger meshes use the spatial sort instead
+MORTON_BITS = 10  # grid resolution per axis for spatial triangle sorting
+CACHE_DECAY_POWER = 1.5
+LAST_TRI_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+def optimize_vertex_cache(faces, cache_size=VERTEX_CACHE_SIZE):
+    """Reorder triangles for post-transform vertex cache locality (Forsyth)
+    
+    The scoring loop runs in Python at roughly 20-25 us per face (about 5 s
+    for 250k faces); see optimize_triangle_order for large meshes.
+    """
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    n_faces = len(faces)
+    if n_faces == 0:
+        return faces.copy()
+    
+    flat = faces.ravel()
+    valence = np.bincount(flat)
+    
+    # Per-vertex triangle lists; degenerate triangles like (2, 2, 3) list once
+    pairs = np.unique(flat * n_faces + np.repeat(np.arange(n_faces), 3))
+    splits = np.searchsorted(pairs // n_faces, np.arange(1, len(valence)))
+    remaining = [list(tris) for tris in np.split(pairs % n_faces, splits)]
+    tri_verts = faces.tolist()
+    live = valence.tolist()
+    
+    # Score lookup tables: cache position and remaining valence
+    cache_table = [LAST_TRI_SCORE] * 3 + [
+        (1.0 - (i - 3) / (cache_size - 3)) ** CACHE_DECAY_POWER
+        for i in range(3, cache_size)
+    ]
+    valence_table = [0.0] + [
+        VALENCE_BOOST_SCALE * k ** -VALENCE_BOOST_POWER
+        for k in range(1, int(valence.max()) + 1)
+    ]
+    
+    # Only cache vertices change score, so triangle scores are summed on demand
+    vert_score = [valence_table[k] for k in live]
+    vert_score_array = np.array(vert_score)
+    best = int(np.argmax(vert_score_array[faces].sum(axis=1)))
+    emitted = [False] * n_faces
+    
+    order = []
+    cache = []
+    cursor = 0
+    
+    while len(order) < n_faces:
+        if best < 0:
+            # Cache ran dry: fall back to the next unemitted triangle in input order
+            while emitted[cursor]:
+                cursor += 1
+            best = cursor
+        
+        emitted[best] = True
+        order.append(best)
+        tri = tri_verts[best]
+        for v in tri:
+            live[v] -= 1
+        
+        # Push the triangle's vertices to the front of the LRU cache
+        a, b, c = tri
+        new_cache = [a] + ([b] if b != a else []) + ([c] if c != a and c != b else [])
+        new_cache += [v for v in cache if v != a and v != b and v != c]
+        for v in new_cache[cache_size:]:
+            vert_score[v] = valence_table[live[v]]
+        cache = new_cache[:cache_size]
+        
+        for v in dict.fromkeys(tri):
+            remaining[v].remove(best)
+        
+        # Rescore the cache and pick the best triangle touching it
+        for pos, v in enumerate(cache):
+            vert_score[v] = cache_table[pos] + valence_table[live[v]] if live[v] else 0.0
+        
+        best = -1
+        best_score = -1.0
+        for v in cache:
+            for t in remaining[v]:
+                if emitted[t]:
+                    continue
+                x, y, z = tri_verts[t]
+                score = vert_score[x] + vert_score[y] + vert_score[z]
+                if score > best_score:
+                    best = t
+                    best_score = score
+    
+    order = np.array(order, dtype=np.int64)
+    if np.bincount(order, minlength=n_faces).max() != 1:
+        raise RuntimeError("Vertex cache optimizer did not emit a permutation of the faces")
+    return faces[order]
+
+def _spread_bits(values):
+    """Interleave two zero bits after each of the low 10 bits (Morton helper)"""
+    values = values & np.uint64(0x3FF)
+    values = (values | (values << np.uint64(16))) & np.uint64(0x030000FF)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x0300F00F)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x030C30C3)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x09249249)
+    return values
+
+def sort_triangles_spatially(verts, faces, bits=MORTON_BITS):
+    """Reorder triangles along a Morton (Z-order) curve of their centroids
+    
+    Vectorized alternative to optimize_vertex_cache for large meshes: less
+    cache-efficient (ACMR ~0.85 vs ~0.7 on marching-cubes output) but runs in
+    about a second per million faces.
+    """
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if len(faces) == 0:
+        return faces.copy()
+    
+    centroids = verts[faces].mean(axis=1)
+    grid, _, _ = quantize_positions(centroids, bits=bits)
+    grid = grid.astype(np.uint64)
+    codes = (
+        _spread_bits(grid[:, 0])
+        | (_spread_bits(grid[:, 1]) << np.uint64(1))
+        | (_spread_bits(grid[:, 2]) << np.uint64(2))
+    )
+    return faces[np.argsort(codes, kind='stable')]
+
+def optimize_triangle_order(verts, faces, max_faces=VERTEX_CACHE_MAX_FACES):
+    """Reorder triangles for vertex cache locality
+    
+    Uses Forsyth (optimize_vertex_cache) up to max_faces faces and the
+    vectorized Morton sort above that; pass max_faces=None to always use
+    Forsyth.
+    """
+    if max_faces is not None and len(faces) > max_faces:
+        return sort_triangles_spatially(verts, faces)
+    return optimize_vertex_cache(faces)
+
+def optimize_vertex_fetch(faces):
+    """Renumber vertices in first-use order for vertex fetch locality
+    
+    Returns (remapped_faces, vertex_order) where vertex_order indexes the
+    original vertex arrays. Unreferenced vertices are dropped.
+    """
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    flat = faces.ravel()
+    if len(flat) == 0:
+        return faces.copy(), np.zeros(0, dtype=np.int64)
+    
+    _, first_use = np.unique(flat, return_index=True)
+    vertex_order = flat[np.sort(first_use)]
+    
+    remap = np.full(int(flat.max()) + 1, -1, dtype=np.int64)
+    remap[vertex_order] = np.arange(len(vertex_order))
+    return remap[faces], vertex_order
+
+def quantize_positions(verts, bits=16, uniform=False):
+    """Quantize positions to a `bits`-bit bounding-box grid
+    
+    Returns (quantized int64 array, bbox min, extent). With uniform=True all
+    axes share the largest extent, so dequantizing is a uniform scale.
+    """
+    verts = np.asarray(verts, dtype=np.float64).reshape(-1, 3)
+    if len(verts) == 0:
+        return np.zeros((0, 3), dtype=np.int64), np.zeros(3), np.zeros(3)
+    
+    lo = verts.min(axis=0)
+    extent = verts.max(axis=0) - lo
+    if uniform:
+        extent = np.full(3, extent.max())
+    safe_extent = np.where(extent > 0, extent, 1.0)
+    quantized = np.round((verts - lo) / safe_extent * ((1 << bits) - 1)).astype(np.int64)
+    return quantized, lo, extent